@@ -8,9 +8,15 @@ from __future__ import annotations
 import argparse
 import os
 import shutil
+import stat
 import sys
 import time
-from dataclasses import dataclass
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from functools import partial
+from itertools import count
+from operator import attrgetter
 from pathlib import Path
 
 REPO_ROOT = Path(__file__).resolve().parents[1]
@@ -20,13 +26,9 @@ REPO_ROOT = Path(__file__).resolve().parents[1]
 # 2) Codex sync: import skills into the repo and link repo-managed skills back into ~/.codex.
 
 # Files/directories ignored by dotfiles linking to avoid unsafe or noisy links.
-DEFAULT_IGNORED_NAMES = {
+DEFAULT_IGNORED_NAMES = frozenset({
     ".git",
     ".DS_Store",
-    "README",
-    "README.md",
-    "LICENSE",
-    "LICENSE.md",
     "node_modules",
     "target",
     "dist",
@@ -34,22 +36,44 @@ DEFAULT_IGNORED_NAMES = {
     ".vscode",
     "promptkit",
     "skills",
-}
+})
 
+# README*/LICENSE* variants are matched here rather than listed in the set above.
 DEFAULT_IGNORE_PREFIXES = ("README", "LICENSE")
 
+# First characters of the prefixes; most names fail this and skip the startswith().
+IGNORE_PREFIX_FIRST_CHARS = frozenset(prefix[0] for prefix in DEFAULT_IGNORE_PREFIXES)
+
 # Codex keeps internal/system skills under .system; do not move/link them.
 SKILL_IGNORE_NAMES = {".system", ".DS_Store"}
 SKILL_CONTENT_IGNORE_NAMES = {".DS_Store"}
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
+class PlannedOp:
+    kind: str  # mkdir / move / unlink / rmtree / link / sync / copytree
+    dest: Path
+    src: Path | None = None
+
+
+@dataclass(frozen=True, slots=True)
 class LinkOptions:
     mode: str
     apply: bool
-
-
-@dataclass(frozen=True)
+    # Filesystem changes are queued here while scanning and applied by execute_plan.
+    plan: list[PlannedOp] = field(default_factory=list)
+    # Directories already confirmed or queued by ensure_dir during this run.
+    ensured_dirs: set[Path] = field(default_factory=set)
+    # Directories the pending plan creates (fresh or replacing a non-directory). Their
+    # children cannot exist yet, so probing them would look through whatever is there now.
+    created_dirs: set[Path] = field(default_factory=set)
+    # Shared by every backup of this run, so one run's backups sort together.
+    backup_timestamp: str = field(default_factory=lambda: time.strftime("%Y%m%d-%H%M%S"))
+    # (src dir, dest dir) -> whether os.link works between them; filled by hardlink_or_copy.
+    hardlink_support: dict[tuple[str, str], bool] = field(default_factory=dict)
+
+
+@dataclass(frozen=True, slots=True)
 class DotfilesOptions:
     source_dir: Path
     dest_dir: Path
@@ -57,7 +81,7 @@ class DotfilesOptions:
     link: bool
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class CodexOptions:
     enabled: bool
     import_skills: bool
@@ -66,7 +90,7 @@ class CodexOptions:
     repo_skills_dir: Path
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class ClaudeOptions:
     enabled: bool
     import_skills: bool
@@ -75,9 +99,9 @@ class ClaudeOptions:
     repo_skills_dir: Path
 
 
-def main() -> int:
+def main(argv: list[str] | None = None) -> int:
     """Entrypoint: parse args, then run dotfile linking and agent skill sync."""
-    args = parse_args()
+    args = parse_args(argv)
 
     # --codex-sync is a shorthand that enables both import and linking.
     if args.codex_sync:
@@ -103,6 +127,9 @@ def main() -> int:
 
     link_options = LinkOptions(mode=args.mode, apply=args.apply)
 
+    # The dotfiles source is fully resolved because its link targets must be canonical.
+    # Roots handed to ensure_dir (dest, repo skills) are resolved too: the user may point
+    # them at a symlink to a directory, which ensure_dir would otherwise back up.
     dotfiles = DotfilesOptions(
         source_dir=Path(args.source_dir).expanduser().resolve(),
         dest_dir=Path(args.dest).expanduser().resolve(),
@@ -113,8 +140,8 @@ def main() -> int:
     codex = CodexOptions(
         enabled=codex_enabled,
         import_skills=import_skills,
-        codex_dir=Path(args.codex_dir).expanduser().resolve(),
-        agents_file=Path(args.agents_file).expanduser().resolve(),
+        codex_dir=normalize_path(args.codex_dir),
+        agents_file=normalize_path(args.agents_file),
         repo_skills_dir=Path(args.repo_skills_dir).expanduser().resolve(),
     )
 
@@ -122,8 +149,8 @@ def main() -> int:
         enabled=claude_enabled,
         import_skills=claude_import,
         link_root=claude_link_root,
-        claude_dir=Path(args.claude_dir).expanduser().resolve(),
-        repo_skills_dir=Path(args.repo_skills_dir).expanduser().resolve(),
+        claude_dir=normalize_path(args.claude_dir),
+        repo_skills_dir=codex.repo_skills_dir,
     )
 
     # Dotfiles linking mirrors repo files to the destination directory.
@@ -144,9 +171,19 @@ def main() -> int:
     return 0
 
 
-def parse_args() -> argparse.Namespace:
+def install(argv: list[str]) -> int:
+    """Run one installer invocation in-process.
+
+    Lets scripted setups run several configurations from a single interpreter:
+    python3 -c "from install import install; install([...]); install([...])"
+    """
+    return main(argv)
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
     """Define CLI flags for dotfile linking and Codex/Claude skill management."""
-    default_dest = os.environ.get("DEST_DIR", str(Path.home()))
+    home = Path.home()
+    default_dest = os.environ.get("DEST_DIR", str(home))
 
     # Keep usage readable: this script is frequently run directly by humans.
     parser = argparse.ArgumentParser(
@@ -229,7 +266,7 @@ def parse_args() -> argparse.Namespace:
     )
     parser.add_argument(
         "--codex-dir",
-        default=str(Path.home() / ".codex"),
+        default=str(home / ".codex"),
         help="Codex directory to manage (default: ~/.codex).",
     )
     parser.add_argument(
@@ -244,11 +281,17 @@ def parse_args() -> argparse.Namespace:
     )
     parser.add_argument(
         "--claude-dir",
-        default=str(Path.home() / ".claude"),
+        default=str(home / ".claude"),
         help="Claude directory to manage (default: ~/.claude).",
     )
 
-    return parser.parse_args()
+    return parser.parse_args(argv)
+
+
+def normalize_path(value: str) -> Path:
+    """Expand ~ and make a CLI path absolute; only relative paths pay for resolve()."""
+    path = Path(value).expanduser()
+    return path if path.is_absolute() else path.resolve()
 
 
 def link_dotfiles(options: DotfilesOptions, link_options: LinkOptions) -> None:
@@ -258,59 +301,74 @@ def link_dotfiles(options: DotfilesOptions, link_options: LinkOptions) -> None:
 
     log("ROOT", f"{options.source_dir} -> {options.dest_dir}")
 
+    # Create the destination root once; links below rely on their parent existing.
+    if not ensure_dir(options.dest_dir, link_options):
+        return
+
     if options.scope == "top":
         link_top_level(options, link_options)
     else:
         link_tree(options, link_options)
+    execute_plan(link_options)
 
 
 def link_top_level(options: DotfilesOptions, link_options: LinkOptions) -> None:
     """Link only top-level entries from the source directory into the destination."""
-    for entry in sorted(options.source_dir.iterdir(), key=lambda path: path.name):
+    for entry in scan_sorted(options.source_dir):
         name = entry.name
         if should_ignore(name):
             log("IGNORE", name)
             continue
 
         dest_path = options.dest_dir / name
-        link_path(entry, dest_path, link_options)
+        link_path(Path(entry.path), dest_path, link_options)
 
 
 def link_tree(options: DotfilesOptions, link_options: LinkOptions) -> None:
     """Recursively link files, while skipping ignored entries and destination loops."""
-    dest_root = options.dest_dir.resolve()
-    walk_tree(options.source_dir, options.dest_dir, dest_root, Path(""), link_options)
+    walk_tree(options.source_dir, options.dest_dir, link_options)
 
 
 def walk_tree(
-    current_src: Path,
+    src_root: Path,
     dest_root: Path,
-    dest_root_resolved: Path,
-    rel_prefix: Path,
     link_options: LinkOptions,
 ) -> None:
     """Traverse source tree and link files into destination while avoiding loops."""
-    for entry in sorted(current_src.iterdir(), key=lambda path: path.name):
+    dest_root_str = os.fspath(dest_root)
+    # Descending into dest or one of its ancestors would walk our own output.
+    dest_keys = ancestor_keys(dest_root)
+
+    # Depth-first over a stack of sorted listings: same pre-order as recursion, but
+    # without a Python frame per directory. Relative paths stay plain strings.
+    stack: list[tuple[Iterator[os.DirEntry[str]], str]] = [(iter(scan_sorted(src_root)), "")]
+    while stack:
+        entries, rel_dir = stack[-1]
+        entry = next(entries, None)
+        if entry is None:
+            stack.pop()
+            continue
+
         name = entry.name
+        rel_path = os.path.join(rel_dir, name)
         if should_ignore(name):
-            log("IGNORE", str(rel_prefix / name))
+            log("IGNORE", rel_path)
             continue
 
-        rel_path = rel_prefix / name
-        src_path = entry
-        dest_path = dest_root / rel_path
+        dest_path = os.path.join(dest_root_str, rel_path)
 
-        if src_path.is_dir() and not src_path.is_symlink():
-            src_resolved = src_path.resolve()
-            if is_within(dest_root_resolved, src_resolved):
+        # DirEntry answers from the cached d_type, so this costs no extra stat.
+        if entry.is_dir(follow_symlinks=False):
+            entry_stat = entry.stat(follow_symlinks=False)
+            if (entry_stat.st_dev, entry_stat.st_ino) in dest_keys:
                 log("IGNORE", f"{rel_path} (dest)")
                 continue
 
-            # Ensure the destination directory exists before recursing.
-            if ensure_dir(dest_path, link_options):
-                walk_tree(src_path, dest_root, dest_root_resolved, rel_path, link_options)
+            # Ensure the destination directory exists before descending.
+            if ensure_dir(Path(dest_path), link_options):
+                stack.append((iter(scan_sorted(entry.path)), rel_path))
         else:
-            link_path(src_path, dest_path, link_options)
+            link_path(Path(entry.path), Path(dest_path), link_options)
 
 
 def sync_codex(codex: CodexOptions, link_options: LinkOptions) -> None:
@@ -322,14 +380,18 @@ def sync_codex(codex: CodexOptions, link_options: LinkOptions) -> None:
     codex_skills_dir = codex_dir / "skills"
     ensure_dir(codex_skills_dir, link_options)
     ensure_dir(codex.repo_skills_dir, link_options)
+    execute_plan(link_options)
 
-    # Import first so linking always uses the repo as the source of truth.
+    # Import first so linking always uses the repo as the source of truth. Both steps
+    # share one plan: moves are applied before the copies that bring skills back.
+    imported: list[str] = []
     if codex.import_skills:
-        import_codex_skills(codex_skills_dir, codex.repo_skills_dir, link_options)
+        imported = import_codex_skills(codex_skills_dir, codex.repo_skills_dir, link_options)
 
     if codex.enabled:
         link_path(codex.agents_file, codex_dir / "AGENTS.md", link_options)
-        link_repo_skills(codex.repo_skills_dir, codex_skills_dir, link_options)
+        link_repo_skills(codex.repo_skills_dir, codex_skills_dir, imported, link_options)
+    execute_plan(link_options)
 
 
 def sync_claude(claude: ClaudeOptions, link_options: LinkOptions) -> None:
@@ -344,7 +406,9 @@ def sync_claude(claude: ClaudeOptions, link_options: LinkOptions) -> None:
     # Import first so linking always uses the repo as the source of truth.
     if claude.import_skills:
         ensure_dir(claude_skills_dir, link_options)
+        execute_plan(link_options)
         import_claude_skills(claude_skills_dir, claude.repo_skills_dir, link_options)
+    execute_plan(link_options)
 
     if claude.enabled:
         if claude.link_root:
@@ -352,63 +416,85 @@ def sync_claude(claude: ClaudeOptions, link_options: LinkOptions) -> None:
         else:
             ensure_dir(claude_skills_dir, link_options)
             link_claude_skills(claude.repo_skills_dir, claude_skills_dir, link_options)
+        execute_plan(link_options)
 
 
 def import_codex_skills(
     codex_skills_dir: Path,
     repo_skills_dir: Path,
     link_options: LinkOptions,
-) -> None:
-    """Move Codex skill directories into the repo for centralized management."""
-    for entry in sorted(codex_skills_dir.iterdir(), key=lambda path: path.name):
+) -> list[str]:
+    """Move Codex skill directories into the repo; return the names queued to move."""
+    imported: list[str] = []
+    for entry in scan_sorted(codex_skills_dir):
         name = entry.name
         if name in SKILL_IGNORE_NAMES:
             continue
 
         # If already linked to the repo, leave as-is; otherwise fail fast.
         if entry.is_symlink():
-            src_target = entry.resolve(strict=False)
-            expected_target = (repo_skills_dir / name).resolve(strict=False)
-            if src_target == expected_target:
-                log("NOOP", f"{entry} already linked")
+            if links_to(entry.path, repo_skills_dir / name):
+                log("NOOP", f"{entry.path} already linked")
                 continue
-            raise ValueError(f"Skill is a symlink with unexpected target: {entry}")
+            raise ValueError(f"Skill is a symlink with unexpected target: {entry.path}")
 
         # Codex skills are directories containing SKILL.md; enforce that contract.
-        if not entry.is_dir():
-            raise ValueError(f"Skill entry is not a directory: {entry}")
+        if not entry.is_dir(follow_symlinks=False):
+            raise ValueError(f"Skill entry is not a directory: {entry.path}")
 
         dest = repo_skills_dir / name
-        if dest.exists():
-            if dest.is_dir():
-                log("NOOP", f"{dest} already exists")
-                continue
-            raise ValueError(f"Skill already exists in repo: {dest}")
+        if repo_skill_exists(dest):
+            log("NOOP", f"{dest} already exists")
+            continue
 
         # Move the skill directory into the repo to establish the single source of truth.
-        log("MOVE", f"{entry} -> {dest}")
-        if link_options.apply:
-            shutil.move(str(entry), str(dest))
+        log("MOVE", f"{entry.path} -> {dest}")
+        link_options.plan.append(PlannedOp("move", dest, Path(entry.path)))
+        imported.append(name)
+    return imported
 
 
 def link_repo_skills(
     repo_skills_dir: Path,
     codex_skills_dir: Path,
+    imported: list[str],
     link_options: LinkOptions,
 ) -> None:
     """Install repo skills into ~/.codex/skills using non-symlink files."""
-    for entry in sorted(repo_skills_dir.iterdir(), key=lambda path: path.name):
+    # Skills being imported leave an empty slot behind and are not in the repo listing
+    # yet, so copy them back directly instead of rescanning after the move.
+    for name in imported:
+        # Same filter as the repo listing below: hidden entries are moved, not installed.
+        if should_ignore_repo_skill(name):
+            continue
+        src_dir = repo_skills_dir / name
+        dest_dir = codex_skills_dir / name
+        # Not moved yet: validate the tree where it still lives.
+        reject_skill_symlinks(dest_dir)
+        log("COPYTREE", f"{dest_dir} <- {src_dir}")
+        link_options.plan.append(PlannedOp("copytree", dest_dir, src_dir))
+
+    for entry in scan_sorted(repo_skills_dir):
         name = entry.name
-        if name in SKILL_IGNORE_NAMES or name.startswith("."):
+        if should_ignore_repo_skill(name):
             continue
         if not entry.is_dir():
-            raise ValueError(f"Repo skill is not a directory: {entry}")
+            raise ValueError(f"Repo skill is not a directory: {entry.path}")
 
         # Materialize the skill directory so Codex's scanner can see SKILL.md,
         # then sync files inside back to the repo as the source of truth.
+        src_dir = Path(entry.path)
         dest_dir = codex_skills_dir / name
+
+        # Fresh install: there are no conflicts to resolve, so copy the tree in one op.
+        if not os.path.lexists(dest_dir):
+            reject_skill_symlinks(src_dir)
+            log("COPYTREE", f"{dest_dir} <- {src_dir}")
+            link_options.plan.append(PlannedOp("copytree", dest_dir, src_dir))
+            continue
+
         if ensure_dir(dest_dir, link_options):
-            sync_skill_contents(entry, dest_dir, link_options)
+            sync_skill_contents(src_dir, dest_dir, link_options)
 
 
 def import_claude_skills(
@@ -417,7 +503,7 @@ def import_claude_skills(
     link_options: LinkOptions,
 ) -> None:
     """Move Claude-managed skill directories into the repo (single source of truth)."""
-    for entry in sorted(claude_skills_dir.iterdir(), key=lambda path: path.name):
+    for entry in scan_sorted(claude_skills_dir):
         name = entry.name
         if name in SKILL_IGNORE_NAMES:
             continue
@@ -426,25 +512,20 @@ def import_claude_skills(
             continue
         # Allow already-linked entries; otherwise fail fast on unexpected symlinks.
         if entry.is_symlink():
-            src_target = entry.resolve(strict=False)
-            expected_target = (repo_skills_dir / name).resolve(strict=False)
-            if src_target == expected_target:
-                log("NOOP", f"{entry} already linked")
+            if links_to(entry.path, repo_skills_dir / name):
+                log("NOOP", f"{entry.path} already linked")
                 continue
-            raise ValueError(f"Claude skill is a symlink with unexpected target: {entry}")
-        if not entry.is_dir():
+            raise ValueError(f"Claude skill is a symlink with unexpected target: {entry.path}")
+        if not entry.is_dir(follow_symlinks=False):
             continue
 
         dest = repo_skills_dir / name
-        if dest.exists():
-            if dest.is_dir():
-                log("NOOP", f"{dest} already exists")
-                continue
-            raise ValueError(f"Skill already exists in repo: {dest}")
+        if repo_skill_exists(dest):
+            log("NOOP", f"{dest} already exists")
+            continue
 
-        log("MOVE", f"{entry} -> {dest}")
-        if link_options.apply:
-            shutil.move(str(entry), str(dest))
+        log("MOVE", f"{entry.path} -> {dest}")
+        link_options.plan.append(PlannedOp("move", dest, Path(entry.path)))
 
 
 def link_claude_skills(
@@ -453,61 +534,145 @@ def link_claude_skills(
     link_options: LinkOptions,
 ) -> None:
     """Link repo skills into ~/.claude/skills using symlinks."""
-    for entry in sorted(repo_skills_dir.iterdir(), key=lambda path: path.name):
+    for entry in scan_sorted(repo_skills_dir):
         name = entry.name
-        if name in SKILL_IGNORE_NAMES or name.startswith("."):
+        if should_ignore_repo_skill(name):
             continue
         if not entry.is_dir():
-            raise ValueError(f"Repo skill is not a directory: {entry}")
+            raise ValueError(f"Repo skill is not a directory: {entry.path}")
 
-        link_path(entry, claude_skills_dir / name, link_options)
+        link_path(Path(entry.path), claude_skills_dir / name, link_options)
+
+
+def repo_skill_exists(dest: Path) -> bool:
+    """Return True when dest is already a repo skill directory; raise if it is not one."""
+    # One stat instead of exists() followed by is_dir().
+    try:
+        st_mode = os.stat(dest).st_mode
+    except (FileNotFoundError, NotADirectoryError):
+        return False
+    if not stat.S_ISDIR(st_mode):
+        raise ValueError(f"Skill already exists in repo: {dest}")
+    return True
+
+
+def scan_sorted(path: str | Path) -> list[os.DirEntry[str]]:
+    """List a directory sorted by name; DirEntry caches the file type from readdir."""
+    with os.scandir(path) as entries:
+        return sorted(entries, key=attrgetter("name"))
 
 
 def should_ignore(name: str) -> bool:
     """Return True when a top-level entry should be ignored by dotfile linking."""
     if name in DEFAULT_IGNORED_NAMES:
         return True
-    return name.startswith(DEFAULT_IGNORE_PREFIXES)
+    return name[:1] in IGNORE_PREFIX_FIRST_CHARS and name.startswith(DEFAULT_IGNORE_PREFIXES)
+
+
+def should_ignore_repo_skill(name: str) -> bool:
+    """Return True for hidden/internal entries of the repo skills directory."""
+    # Every SKILL_IGNORE_NAMES entry is a dot-name, so this one check covers them too.
+    return name.startswith(".")
+
+
+def should_ignore_skill_content(name: str) -> bool:
+    """Return True for files inside a skill that should not be synced."""
+    return name in SKILL_CONTENT_IGNORE_NAMES or name.startswith("SKILL.md.bak-")
+
+
+def skill_copytree_ignore(directory: str, names: list[str]) -> set[str]:
+    """shutil.copytree ignore hook applying the sync_skill_contents ignore rules."""
+    return {name for name in names if should_ignore_skill_content(name)}
+
+
+def reject_skill_symlinks(src_dir: Path) -> None:
+    """Raise if a skill tree queued for copytree contains a symlink.
+
+    sync_skill_contents enforces this while planning; do the same for copytree so a
+    dry run reports it and --apply fails before any queued op has run.
+    """
+    stack = [os.fspath(src_dir)]
+    while stack:
+        for entry in scan_sorted(stack.pop()):
+            if should_ignore_skill_content(entry.name):
+                continue
+            if entry.is_symlink():
+                raise ValueError(f"Skill entries must not be symlinks: {entry.path}")
+            if entry.is_dir(follow_symlinks=False):
+                stack.append(entry.path)
 
 
 def ensure_dir(path: Path, link_options: LinkOptions) -> bool:
     """Create directories with conflict handling for existing paths."""
-    if path.is_dir() and not path.is_symlink():
+    if path in link_options.ensured_dirs:
         return True
 
-    if path.exists() or path.is_symlink():
-        if not handle_existing(path, link_options):
+    st_mode = planned_lstat_mode(path, link_options)
+    if st_mode is not None:
+        if stat.S_ISDIR(st_mode):
+            link_options.ensured_dirs.add(path)
+            return True
+        if not handle_existing(path, st_mode, link_options):
             return False
 
     log("MKDIR", str(path))
-    if link_options.apply:
-        path.mkdir(parents=True, exist_ok=True)
+    link_options.plan.append(PlannedOp("mkdir", path))
+    link_options.ensured_dirs.add(path)
+    link_options.created_dirs.add(path)
     return True
 
 
 def link_path(src: Path, dest: Path, link_options: LinkOptions) -> None:
     """Symlink src -> dest with conflict handling and idempotent checks."""
-    # If already linked to the same target, keep it.
-    if dest.is_symlink():
-        dest_target = dest.resolve(strict=False)
-        src_target = src.resolve(strict=False)
-        if dest_target == src_target:
+    st_mode = planned_lstat_mode(dest, link_options)
+    if st_mode is not None:
+        # If already linked to the same target, keep it.
+        if stat.S_ISLNK(st_mode) and links_to(dest, src):
             log("NOOP", f"{dest} -> {src}")
             return
 
-    # Resolve conflicts before creating the link.
-    if dest.exists() or dest.is_symlink():
-        if not handle_existing(dest, link_options):
+        # Resolve conflicts before creating the link.
+        if not handle_existing(dest, st_mode, link_options):
             return
 
     log("LINK", f"{dest} -> {src}")
-    if link_options.apply:
-        dest.parent.mkdir(parents=True, exist_ok=True)
-        dest.symlink_to(src)
+    # Callers create dest.parent up front (ensure_dir), so no per-link mkdir here.
+    link_options.plan.append(PlannedOp("link", dest, src))
+
+
+def lstat_mode(path: str | Path) -> int | None:
+    """Return the lstat mode of path, or None when nothing (not even a link) is there.
+
+    One lstat answers "exists", "is a symlink" and "is a directory" together.
+    """
+    try:
+        return os.lstat(path).st_mode
+    except (FileNotFoundError, NotADirectoryError):
+        return None
+
 
+def planned_lstat_mode(path: Path, link_options: LinkOptions) -> int | None:
+    """lstat_mode as it will be once the pending plan runs.
 
-def handle_existing(path: Path, link_options: LinkOptions) -> bool:
-    """Apply conflict policy; return True if caller should continue."""
+    Anything inside a directory the plan creates is absent, even if an old symlink at
+    that directory's path still resolves to existing files right now.
+    """
+    if path.parent in link_options.created_dirs:
+        return None
+    return lstat_mode(path)
+
+
+def links_to(link: str | Path, target: Path) -> bool:
+    """Return True when the symlink at link resolves to the same path as target."""
+    # Links created by this script store the absolute target, so one readlink settles
+    # the common case; only a textual mismatch (e.g. relative links) pays for realpath.
+    if os.readlink(link) == os.fspath(target):
+        return True
+    return os.path.realpath(link) == os.path.realpath(target)
+
+
+def handle_existing(path: Path, st_mode: int, link_options: LinkOptions) -> bool:
+    """Apply conflict policy to path (lstat mode st_mode); return True to continue."""
     mode = link_options.mode
     if mode == "skip":
         log("SKIP", str(path))
@@ -516,95 +681,204 @@ def handle_existing(path: Path, link_options: LinkOptions) -> bool:
     if mode == "fail":
         raise ValueError(f"Path already exists: {path}")
 
+    # The path is about to be moved or removed, so it no longer counts as ensured.
+    link_options.ensured_dirs.discard(path)
+
     if mode == "backup":
-        backup = backup_path(path)
+        backup = backup_path(path, link_options.backup_timestamp)
         log("BACKUP", f"{path} -> {backup}")
-        if link_options.apply:
-            shutil.move(str(path), str(backup))
+        link_options.plan.append(PlannedOp("move", backup, path))
         return True
 
     if mode == "replace":
         log("REMOVE", str(path))
-        if link_options.apply:
-            remove_path(path)
+        # Only real directories need rmtree; files and symlinks (even to dirs) unlink.
+        kind = "rmtree" if stat.S_ISDIR(st_mode) else "unlink"
+        link_options.plan.append(PlannedOp(kind, path))
         return True
 
     raise ValueError(f"Unknown mode: {mode}")
 
 
-def backup_path(path: Path) -> Path:
+def backup_path(path: Path, timestamp: str) -> Path:
     """Return a timestamped backup path in the same directory."""
-    suffix = time.strftime("%Y%m%d-%H%M%S")
-    return path.with_name(f"{path.name}.bak-{suffix}")
-
-
-def remove_path(path: Path) -> None:
-    """Remove a path whether it's a file, directory, or symlink."""
-    if path.is_symlink() or path.is_file():
-        path.unlink()
-        return
-    if path.is_dir():
-        shutil.rmtree(path)
-        return
-    path.unlink()
-
-
-def is_within(candidate: Path, root: Path) -> bool:
-    """Return True when candidate path is inside root."""
-    try:
-        candidate.relative_to(root)
-        return True
-    except ValueError:
-        return False
+    base = f"{path.name}.bak-{timestamp}"
+    backup = path.with_name(base)
+    # Only pay for a counter when an earlier backup already took the name.
+    counter = count()
+    while os.path.lexists(backup):
+        backup = path.with_name(f"{base}-{next(counter)}")
+    return backup
+
+
+def ancestor_keys(path: Path) -> set[tuple[int, int]]:
+    """Return (st_dev, st_ino) for path and each of its existing ancestors."""
+    keys = set()
+    for candidate in (path, *path.parents):
+        try:
+            st = os.stat(candidate)
+        except (FileNotFoundError, NotADirectoryError):
+            continue
+        keys.add((st.st_dev, st.st_ino))
+    return keys
 
 
 def log(action: str, detail: str) -> None:
     """Standard log formatter for script actions."""
-    print(f"{action:<8} {detail}")
+    sys.stdout.write(f"{action:<8} {detail}\n")
 
 
 def sync_skill_contents(src_dir: Path, dest_dir: Path, link_options: LinkOptions) -> None:
-    """Sync all files under a skill directory into an existing destination directory."""
-    for entry in sorted(src_dir.iterdir(), key=lambda path: path.name):
+    """Sync all files under a skill directory into an existing destination directory.
+
+    dest_dir and every subdirectory are created via ensure_dir before their files are
+    synced, so sync_skill_file never needs to create parents itself.
+    """
+    # Destinations stay plain strings (like walk_tree); Path is built only per leaf op.
+    stack: list[tuple[Iterator[os.DirEntry[str]], str]] = [
+        (iter(scan_sorted(src_dir)), os.fspath(dest_dir))
+    ]
+    while stack:
+        entries, current_dest = stack[-1]
+        entry = next(entries, None)
+        if entry is None:
+            stack.pop()
+            continue
+
         name = entry.name
-        if name in SKILL_CONTENT_IGNORE_NAMES or name.startswith("SKILL.md.bak-"):
+        if should_ignore_skill_content(name):
             continue
 
-        dest_path = dest_dir / name
+        dest_path = os.path.join(current_dest, name)
 
         if entry.is_symlink():
-            raise ValueError(f"Skill entries must not be symlinks: {entry}")
+            raise ValueError(f"Skill entries must not be symlinks: {entry.path}")
 
-        if entry.is_dir():
-            if ensure_dir(dest_path, link_options):
-                sync_skill_contents(entry, dest_path, link_options)
+        if entry.is_dir(follow_symlinks=False):
+            if ensure_dir(Path(dest_path), link_options):
+                stack.append((iter(scan_sorted(entry.path)), dest_path))
             continue
 
-        sync_skill_file(entry, dest_path, link_options)
+        sync_skill_file(Path(entry.path), Path(dest_path), link_options)
 
 
 def sync_skill_file(src: Path, dest: Path, link_options: LinkOptions) -> None:
     """Copy or hardlink a skill file into the destination (no symlinks)."""
-    if dest.exists() or dest.is_symlink():
-        if not handle_existing(dest, link_options):
+    st_mode = planned_lstat_mode(dest, link_options)
+    if st_mode is not None:
+        if not handle_existing(dest, st_mode, link_options):
             return
 
+    # Applied runs report HARDLINK/COPY once execute_plan knows which one happened.
     if not link_options.apply:
         log("SYNC", f"{dest} <- {src}")
-        return
+    link_options.plan.append(PlannedOp("sync", dest, src))
 
-    dest.parent.mkdir(parents=True, exist_ok=True)
-    try:
-        os.link(src, dest)
-        log("HARDLINK", f"{dest} -> {src}")
-    except OSError:
-        shutil.copy2(src, dest)
-        log("COPY", f"{dest} <- {src}")
+
+def execute_plan(link_options: LinkOptions) -> None:
+    """Apply queued operations (dry-run: just drop them; they were already logged)."""
+    plan = link_options.plan
+    if link_options.apply:
+        links: list[PlannedOp] = []
+        syncs: list[PlannedOp] = []
+        copytrees: list[PlannedOp] = []
+        for op in plan:
+            if op.kind == "link":
+                links.append(op)
+            elif op.kind == "sync":
+                syncs.append(op)
+            elif op.kind == "copytree":
+                copytrees.append(op)
+            else:
+                # Structural ops may depend on each other, so keep plan order.
+                apply_structural_op(op)
+
+        # Every link and synced file targets a distinct path whose parent now exists, so
+        # the syscalls are independent and can overlap (they release the GIL). Results
+        # are consumed in plan order, which re-raises failures and keeps the log stable.
+        if links or syncs:
+            with ThreadPoolExecutor() as pool:
+                list(pool.map(os.symlink, [op.src for op in links], [op.dest for op in links]))
+                actions = pool.map(
+                    partial(hardlink_or_copy, hardlink_support=link_options.hardlink_support),
+                    [op.src for op in syncs],
+                    [op.dest for op in syncs],
+                )
+                for op, action in zip(syncs, actions):
+                    log_file_sync(action, op.src, op.dest)
+
+        # copytree creates its own directories; each tree is copied file by file.
+        for op in copytrees:
+            shutil.copytree(
+                op.src,
+                op.dest,
+                copy_function=partial(
+                    copy_skill_file, hardlink_support=link_options.hardlink_support
+                ),
+                ignore=skill_copytree_ignore,
+            )
+        # Show progress per applied phase even when stdout is block-buffered.
+        sys.stdout.flush()
+    plan.clear()
+    # Applied or dropped, the created directories are no longer pending; probe for real.
+    link_options.created_dirs.clear()
+
+
+def apply_structural_op(op: PlannedOp) -> None:
+    """Apply a mkdir, move, unlink, or rmtree operation."""
+    if op.kind == "mkdir":
+        op.dest.mkdir(parents=True, exist_ok=True)
+    elif op.kind == "move":
+        shutil.move(op.src, op.dest)
+    elif op.kind == "unlink":
+        os.unlink(op.dest)
+    elif op.kind == "rmtree":
+        shutil.rmtree(op.dest)
+    else:
+        raise ValueError(f"Unknown operation: {op.kind}")
+
+
+def copy_skill_file(
+    src: str | Path, dest: str | Path, hardlink_support: dict[tuple[str, str], bool]
+) -> None:
+    """shutil.copytree copy hook: hardlink or copy one file and log which happened."""
+    log_file_sync(hardlink_or_copy(src, dest, hardlink_support), src, dest)
+
+
+def log_file_sync(action: str, src: str | Path, dest: str | Path) -> None:
+    """Log the outcome of hardlink_or_copy."""
+    if action == "HARDLINK":
+        log(action, f"{dest} -> {src}")
+    else:
+        log(action, f"{dest} <- {src}")
+
+
+def hardlink_or_copy(
+    src: str | Path, dest: str | Path, hardlink_support: dict[tuple[str, str], bool]
+) -> str:
+    """Hardlink src to dest when the filesystem allows it, else copy; return the action."""
+    # The first file synced between two directories decides whether hardlinks work
+    # there (e.g. not across filesystems); later files go straight to that strategy.
+    key = (os.path.dirname(src), os.path.dirname(dest))
+    if hardlink_support.get(key, True):
+        try:
+            os.link(src, dest)
+        except OSError:
+            hardlink_support[key] = False
+        else:
+            hardlink_support[key] = True
+            return "HARDLINK"
+
+    # copy keeps mode bits (scripts stay executable) without copy2's extra utime call.
+    shutil.copy(src, dest)
+    return "COPY"
 
 
 if __name__ == "__main__":
+    # A large tree logs thousands of lines; don't flush a terminal on every one.
+    sys.stdout.reconfigure(line_buffering=False)
     try:
         raise SystemExit(main())
     except Exception as exc:
-        print(f"ERROR: {exc}")
+        print(f"ERROR: {exc}", flush=True)
         raise
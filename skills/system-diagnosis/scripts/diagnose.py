@@ -3,12 +3,61 @@
 System diagnosis script: CPU, memory usage, and process ancestry tracking.
 """
 
+import ctypes
+import heapq
+import re
+import resource
 import subprocess
 import sys
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
-
-
-@dataclass
+from operator import attrgetter, itemgetter
+from typing import Optional
+
+# Slotted dataclasses (no per-instance __dict__) need Python 3.10; the python3 that
+# ships with macOS is 3.9, so only ask for slots where they are supported.
+DATACLASS_SLOTS = {"slots": True} if sys.version_info >= (3, 10) else {}
+
+# Section rule for the report
+SEPARATOR = "=" * 70
+
+# vm_stat counters used by get_system_stats
+VM_STAT_KEYS = (
+    "Pages free", "Pages active", "Pages inactive", "Pages speculative",
+    "Pages wired down", "Pages occupied by compressor", "Pages purgeable",
+    "Pageins", "Pageouts", "Swapins", "Swapouts",
+)
+
+# host_statistics(HOST_CPU_LOAD_INFO): four natural_t tick counters (user, system, idle, nice)
+HOST_CPU_LOAD_INFO = 3
+HOST_CPU_LOAD_INFO_COUNT = 4
+CPU_SAMPLE_SECONDS = 0.1
+
+VM_STAT_PAGE_SIZE_RE = re.compile(r"page size of (\d+) bytes")
+
+# Patterns that indicate a script/dev process (likely orphan if PPID=1)
+ORPHAN_PATTERNS = [
+    "node ", "npm ", "npx ", "bun ", "deno ",
+    "python ", "python3 ", "ruby ", "perl ",
+    "chrome-devtools", "webpack", "vite", "next-server",
+    "ts-node", "tsx ", "esbuild", "turbo ",
+]
+
+# Patterns that indicate legitimate daemon/service (not orphan)
+LEGITIMATE_PATTERNS = [
+    "/System/", "/usr/libexec/", "/usr/sbin/", "/sbin/",
+    "/Library/Apple/", "/Library/PrivilegedHelperTools/",
+    ".app/Contents/MacOS/",  # App main executables
+]
+
+# One alternation per list: a single search per command instead of a scan per pattern
+ORPHAN_RE = re.compile("|".join(map(re.escape, ORPHAN_PATTERNS)), re.IGNORECASE)
+LEGITIMATE_RE = re.compile("|".join(map(re.escape, LEGITIMATE_PATTERNS)))
+
+
+@dataclass(**DATACLASS_SLOTS)
 class ProcessInfo:
     pid: int
     ppid: int
@@ -17,72 +66,49 @@ class ProcessInfo:
     command: str
     vsize_mb: float = 0.0  # Virtual memory size
     rss_mb: float = 0.0    # Resident set size (physical memory)
+    etime: str = ""        # Elapsed time
 
 
-def get_top_processes(sort_by: str = "cpu", limit: int = 10) -> list[ProcessInfo]:
-    """Get top processes sorted by CPU or memory usage."""
-    # ps output: PID, PPID, %CPU, %MEM, COMMAND (full)
-    result = subprocess.run(
-        ["ps", "-eo", "pid,ppid,pcpu,pmem,command", "-r"],
-        capture_output=True,
-        text=True,
-    )
-
+def snapshot_processes() -> list[ProcessInfo]:
+    """Run ps once and parse every process; all views below derive from this list."""
+    # ps output: PID, PPID, %CPU, %MEM, VSZ (KB), RSS (KB), ETIME, COMMAND
+    # Trailing "=" suppresses the header line. Lines are parsed as ps writes them,
+    # without holding the whole output and a second list of lines in memory.
+    # Read bytes: int()/float() accept them directly, so only text fields get decoded.
     processes = []
-    for line in result.stdout.strip().split("\n")[1:]:  # Skip header
-        parts = line.split(None, 4)
-        if len(parts) < 5:
-            continue
-        try:
-            processes.append(
-                ProcessInfo(
-                    pid=int(parts[0]),
-                    ppid=int(parts[1]),
-                    cpu=float(parts[2]),
-                    mem=float(parts[3]),
-                    command=parts[4],
+    with subprocess.Popen(
+        ["ps", "-eo", "pid=,ppid=,pcpu=,pmem=,vsz=,rss=,etime=,command="],
+        stdout=subprocess.PIPE,
+    ) as ps:
+        for line in ps.stdout:
+            parts = line.split(None, 7)
+            if len(parts) < 8:
+                continue
+            try:
+                processes.append(
+                    ProcessInfo(
+                        pid=int(parts[0]),
+                        ppid=int(parts[1]),
+                        cpu=float(parts[2]),
+                        mem=float(parts[3]),
+                        command=parts[7].rstrip(b"\n").decode("utf-8", "replace"),
+                        vsize_mb=int(parts[4]) / 1024,  # KB to MB
+                        rss_mb=int(parts[5]) / 1024,    # KB to MB
+                        etime=parts[6].decode("ascii"),
+                    )
                 )
-            )
-        except (ValueError, IndexError):
-            continue
-
-    if sort_by == "mem":
-        processes.sort(key=lambda p: p.mem, reverse=True)
-    # Already sorted by CPU from ps -r
-
-    return processes[:limit]
-
+            except (ValueError, IndexError):
+                continue
 
-def get_processes_with_memory() -> list[ProcessInfo]:
-    """Get all processes with memory details (VSIZE and RSS)."""
-    # ps output: PID, PPID, %CPU, %MEM, VSZ (KB), RSS (KB), COMMAND
-    result = subprocess.run(
-        ["ps", "-eo", "pid,ppid,pcpu,pmem,vsz,rss,command"],
-        capture_output=True,
-        text=True,
-    )
+    return processes
 
-    processes = []
-    for line in result.stdout.strip().split("\n")[1:]:  # Skip header
-        parts = line.split(None, 6)
-        if len(parts) < 7:
-            continue
-        try:
-            processes.append(
-                ProcessInfo(
-                    pid=int(parts[0]),
-                    ppid=int(parts[1]),
-                    cpu=float(parts[2]),
-                    mem=float(parts[3]),
-                    command=parts[6],
-                    vsize_mb=int(parts[4]) / 1024,  # KB to MB
-                    rss_mb=int(parts[5]) / 1024,    # KB to MB
-                )
-            )
-        except (ValueError, IndexError):
-            continue
 
-    return processes
+def get_top_processes(
+    processes: list[ProcessInfo], sort_by: str = "cpu", limit: int = 10
+) -> list[ProcessInfo]:
+    """Get top processes sorted by CPU or memory usage."""
+    key = attrgetter("mem") if sort_by == "mem" else attrgetter("cpu")
+    return heapq.nlargest(limit, processes, key=key)
 
 
 def get_swap_heavy_processes(processes: list[ProcessInfo], limit: int = 10) -> list[tuple[ProcessInfo, float]]:
@@ -102,117 +128,82 @@ def get_swap_heavy_processes(processes: list[ProcessInfo], limit: int = 10) -> l
         if estimated_swap > 100:  # Only show if > 100MB estimated
             swap_estimates.append((proc, estimated_swap))
 
-    # Sort by estimated swap usage
-    swap_estimates.sort(key=lambda x: x[1], reverse=True)
-    return swap_estimates[:limit]
-
-
-@dataclass
-class OrphanProcess:
-    pid: int
-    etime: str  # Elapsed time
-    rss_mb: float
-    command: str
+    # Only the top entries are shown: select them without sorting the whole list
+    return heapq.nlargest(limit, swap_estimates, key=itemgetter(1))
 
 
-@dataclass
+@dataclass(**DATACLASS_SLOTS)
 class OrphanTree:
     """An orphan process with its descendant tree."""
-    root: OrphanProcess
+    root: ProcessInfo
     descendants: list["OrphanTree"]  # Child processes
+    total_mb: float = 0.0  # RSS of root + all descendants, summed while building
 
     def all_pids(self) -> list[int]:
         """Get all PIDs in this tree (root + all descendants)."""
-        pids = [self.root.pid]
-        for child in self.descendants:
-            pids.extend(child.all_pids())
+        # Explicit stack (pre-order): deep trees don't hit the recursion limit
+        pids = []
+        stack = [self]
+        while stack:
+            tree = stack.pop()
+            pids.append(tree.root.pid)
+            stack.extend(reversed(tree.descendants))
         return pids
 
     def total_memory(self) -> float:
         """Get total memory of root + all descendants."""
-        total = self.root.rss_mb
-        for child in self.descendants:
-            total += child.total_memory()
-        return total
+        return self.total_mb
 
 
 def parse_etime(etime: str) -> int:
     """Convert elapsed time string to seconds for sorting."""
     # Format: [[DD-]HH:]MM:SS or MM:SS
+    days, _, clock = etime.rpartition("-")
     total = 0
-    if "-" in etime:
-        days, rest = etime.split("-", 1)
+    for part in clock.split(":"):  # HH:MM:SS and MM:SS fold the same way
+        total = total * 60 + int(part)
+    if days:
         total += int(days) * 86400
-        etime = rest
-    parts = etime.split(":")
-    if len(parts) == 3:
-        total += int(parts[0]) * 3600 + int(parts[1]) * 60 + int(parts[2])
-    elif len(parts) == 2:
-        total += int(parts[0]) * 60 + int(parts[1])
     return total
 
 
-def get_orphan_processes() -> list[OrphanTree]:
+def get_orphan_processes(processes: list[ProcessInfo]) -> list[OrphanTree]:
     """
     Detect orphan processes - processes with PPID=1 that are likely
     abandoned dev/script processes rather than legitimate daemons.
     Now includes process tree analysis to find all descendants.
     """
-    # Patterns that indicate a script/dev process (likely orphan if PPID=1)
-    orphan_patterns = [
-        "node ", "npm ", "npx ", "bun ", "deno ",
-        "python ", "python3 ", "ruby ", "perl ",
-        "chrome-devtools", "webpack", "vite", "next-server",
-        "ts-node", "tsx ", "esbuild", "turbo ",
-    ]
-
-    # Patterns that indicate legitimate daemon/service (not orphan)
-    legitimate_patterns = [
-        "/System/", "/usr/libexec/", "/usr/sbin/", "/sbin/",
-        "/Library/Apple/", "/Library/PrivilegedHelperTools/",
-        ".app/Contents/MacOS/",  # App main executables
-    ]
-
-    result = subprocess.run(
-        ["ps", "-eo", "pid,ppid,etime,rss,command"],
-        capture_output=True,
-        text=True,
-    )
-
-    # Build process info map and parent->children map
-    all_procs: dict[int, OrphanProcess] = {}
-    children_map: dict[int, list[int]] = {}  # ppid -> [child pids]
-
-    for line in result.stdout.strip().split("\n")[1:]:
-        parts = line.split(None, 4)
-        if len(parts) < 5:
-            continue
-        try:
-            pid = int(parts[0])
-            ppid = int(parts[1])
-            etime = parts[2]
-            rss_kb = int(parts[3])
-            command = parts[4]
-        except (ValueError, IndexError):
-            continue
-
-        all_procs[pid] = OrphanProcess(
-            pid=pid,
-            etime=etime,
-            rss_mb=rss_kb / 1024,
-            command=command,
-        )
+    # Build process info map and parent->children map. Trees point at the snapshot's
+    # ProcessInfo objects, so nothing is allocated per process beyond these indexes.
+    all_procs: dict[int, ProcessInfo] = {}
+    # ppid -> [child pids]; lookups below use .get() so they never add empty entries
+    children_map: dict[int, list[int]] = defaultdict(list)
 
-        if ppid not in children_map:
-            children_map[ppid] = []
-        children_map[ppid].append(pid)
+    for proc in processes:
+        all_procs[proc.pid] = proc
+        children_map[proc.ppid].append(proc.pid)
+
+    def build_tree(root_pid: int) -> OrphanTree:
+        """Build process tree from a root PID (iterative post-order, no recursion)."""
+        built: dict[int, list[OrphanTree]] = {root_pid: []}  # pid -> finished children
+        stack = [(root_pid, iter(children_map.get(root_pid, [])))]
+        while True:
+            pid, child_pids = stack[-1]
+            cpid = next(child_pids, None)
+            if cpid is not None:
+                if cpid in all_procs and cpid not in built:
+                    built[cpid] = []
+                    stack.append((cpid, iter(children_map.get(cpid, []))))
+                continue
 
-    def build_tree(pid: int) -> OrphanTree:
-        """Recursively build process tree from a root PID."""
-        proc = all_procs[pid]
-        child_pids = children_map.get(pid, [])
-        descendants = [build_tree(cpid) for cpid in child_pids if cpid in all_procs]
-        return OrphanTree(root=proc, descendants=descendants)
+            # All children done: assemble this node bottom-up with its memory total
+            stack.pop()
+            descendants = built.pop(pid)
+            total_mb = all_procs[pid].rss_mb + sum(child.total_mb for child in descendants)
+            tree = OrphanTree(root=all_procs[pid], descendants=descendants, total_mb=total_mb)
+            if not stack:
+                return tree
+            built[stack[-1][0]].append(tree)
 
     def is_orphan_candidate(pid: int) -> bool:
         """Check if a PPID=1 process is an orphan candidate."""
@@ -221,11 +212,11 @@ def get_orphan_processes() -> list[OrphanTree]:
         command = all_procs[pid].command
 
         # Skip legitimate system processes
-        if any(pat in command for pat in legitimate_patterns):
+        if LEGITIMATE_RE.search(command):
             return False
 
-        # Check if it matches orphan patterns
-        if any(pat in command.lower() for pat in orphan_patterns):
+        # Check if it matches orphan patterns (case-insensitive)
+        if ORPHAN_RE.search(command):
             return True
 
         # Also check if it's a user process (starts with /Users/)
@@ -249,67 +240,160 @@ def get_orphan_processes() -> list[OrphanTree]:
     return orphan_trees
 
 
-def get_process_ancestry(pid: int, all_procs: dict[int, ProcessInfo]) -> list[str]:
-    """Trace process ancestry from pid to init (PID 1)."""
+def truncate(text: str, width: int) -> str:
+    """Shorten text to at most width characters, marking the cut with "..."."""
+    return text if len(text) <= width else f"{text[:width - 3]}..."
+
+
+def get_process_ancestry(
+    pid: int,
+    all_procs: dict[int, ProcessInfo],
+    cache: Optional[dict[int, list[str]]] = None,
+) -> list[str]:
+    """Trace process ancestry from pid to init (PID 1).
+
+    cache maps pid -> its ancestry; pass one dict across calls so shared tails
+    (the same shell, terminal, launchd) are walked and formatted only once.
+    """
+    # all_procs comes from the same ps snapshot as pid, so every live ancestor is in it;
+    # a missing parent has already exited and a fresh ps could not find it either.
     ancestry = []
     current_pid = pid
     visited = set()
 
-    while current_pid > 0 and current_pid not in visited:
+    walked = []
+
+    while current_pid > 0 and current_pid not in visited and current_pid in all_procs:
+        if cache is not None and current_pid in cache:
+            ancestry.extend(cache[current_pid])
+            break
         visited.add(current_pid)
-        if current_pid in all_procs:
-            proc = all_procs[current_pid]
-            # Truncate long commands for readability
-            cmd = proc.command
-            if len(cmd) > 80:
-                cmd = cmd[:77] + "..."
-            ancestry.append(f"[{proc.pid}] {cmd}")
-            current_pid = proc.ppid
-        else:
-            # Process might have exited, try to get info directly
-            try:
-                result = subprocess.run(
-                    ["ps", "-o", "ppid=,command=", "-p", str(current_pid)],
-                    capture_output=True,
-                    text=True,
-                )
-                if result.stdout.strip():
-                    parts = result.stdout.strip().split(None, 1)
-                    ppid = int(parts[0])
-                    cmd = parts[1] if len(parts) > 1 else "?"
-                    if len(cmd) > 80:
-                        cmd = cmd[:77] + "..."
-                    ancestry.append(f"[{current_pid}] {cmd}")
-                    current_pid = ppid
-                else:
-                    break
-            except (subprocess.SubprocessError, ValueError):
-                break
+        walked.append(current_pid)
+        proc = all_procs[current_pid]
+        # Truncate long commands for readability
+        ancestry.append(f"[{proc.pid}] {truncate(proc.command, 80)}")
+        current_pid = proc.ppid
+
+    if cache is not None:
+        for i, walked_pid in enumerate(walked):
+            cache[walked_pid] = ancestry[i:]
 
     return ancestry
 
 
+def swap_size_gb(value: str) -> float:
+    """Convert a vm.swapusage size such as "2048.00M" or "2.00G" to GB."""
+    if value.endswith("M"):
+        return float(value[:-1]) / 1024
+    return float(value.rstrip("G"))
+
+
+def read_cpu_ticks(libsystem: ctypes.CDLL, host: int) -> list[int]:
+    """Read cumulative (user, system, idle, nice) CPU ticks via host_statistics."""
+    ticks = (ctypes.c_uint32 * HOST_CPU_LOAD_INFO_COUNT)()
+    count = ctypes.c_uint32(HOST_CPU_LOAD_INFO_COUNT)
+    kr = libsystem.host_statistics(host, HOST_CPU_LOAD_INFO, ticks, ctypes.byref(count))
+    if kr != 0:
+        raise OSError(f"host_statistics failed: {kr}")
+    return list(ticks)
+
+
+def get_cpu_usage() -> Optional[tuple[float, float, float]]:
+    """Get (user, sys, idle) CPU percentages from two Mach tick samples, or None."""
+    try:
+        libsystem = ctypes.CDLL("/usr/lib/libSystem.dylib")
+    except OSError:
+        return None  # Not macOS
+    libsystem.mach_host_self.restype = ctypes.c_uint32
+    libsystem.host_statistics.restype = ctypes.c_int
+    libsystem.host_statistics.argtypes = [
+        ctypes.c_uint32,
+        ctypes.c_int,
+        ctypes.POINTER(ctypes.c_uint32),
+        ctypes.POINTER(ctypes.c_uint32),
+    ]
+    host = libsystem.mach_host_self()
+
+    # Counters are cumulative since boot, so usage "now" is the delta over a short window
+    try:
+        before = read_cpu_ticks(libsystem, host)
+        time.sleep(CPU_SAMPLE_SECONDS)
+        after = read_cpu_ticks(libsystem, host)
+    except OSError:
+        return None
+    user, system, idle, nice = ((a - b) % 2**32 for a, b in zip(after, before))
+    total = user + system + idle + nice
+    if total == 0:
+        return None
+    # top counts nice time as user time
+    return (user + nice) / total * 100, system / total * 100, idle / total * 100
+
+
+def get_cpu_usage_from_top() -> tuple[float, float, float]:
+    """Get (user, sys, idle) CPU percentages from a single `top` sample."""
+    top_result = subprocess.run(
+        ["top", "-l", "1", "-n", "0", "-s", "0"],
+        capture_output=True,
+        text=True,
+    )
+    cpu_user = cpu_sys = cpu_idle = 0.0
+    for line in top_result.stdout.split("\n"):
+        if line.startswith("CPU usage:"):
+            # CPU usage: 5.26% user, 10.52% sys, 84.21% idle
+            parts = line.split(",")
+            for part in parts:
+                if "user" in part:
+                    cpu_user = float(part.split("%")[0].split()[-1])
+                elif "sys" in part:
+                    cpu_sys = float(part.split("%")[0].split()[-1])
+                elif "idle" in part:
+                    cpu_idle = float(part.split("%")[0].split()[-1])
+            break
+    return cpu_user, cpu_sys, cpu_idle
+
+
 def get_system_stats() -> dict:
     """Get overall system CPU and memory stats."""
-    # Memory stats via vm_stat
-    vm_result = subprocess.run(["vm_stat"], capture_output=True, text=True)
-    page_size = 16384  # Default, will try to get actual
+    # Sample CPU before starting the other probes, so their forks don't show up as load;
+    # top is only the fallback
+    cpu_usage = get_cpu_usage()
+    if cpu_usage is None:
+        cpu_usage = get_cpu_usage_from_top()
+    cpu_user, cpu_sys, cpu_idle = cpu_usage
+
+    # The remaining probes are independent, so run them concurrently: the wait becomes
+    # the slowest one (usually memory_pressure) instead of the sum of all three.
+    with ThreadPoolExecutor() as pool:
+        vm_future = pool.submit(subprocess.run, ["vm_stat"], capture_output=True, text=True)
+        swap_future = pool.submit(
+            subprocess.run, ["sysctl", "-n", "vm.swapusage"], capture_output=True, text=True
+        )
+        pressure_future = pool.submit(
+            subprocess.run, ["memory_pressure"], capture_output=True, text=True, timeout=5
+        )
 
-    # Try to get page size
-    try:
-        ps_result = subprocess.run(["pagesize"], capture_output=True, text=True)
-        page_size = int(ps_result.stdout.strip())
-    except (subprocess.SubprocessError, ValueError):
-        pass
+    # Memory stats via vm_stat
+    vm_result = vm_future.result()
+    # vm_stat states the page size its counts use; no separate `pagesize` process
+    # Header: "Mach Virtual Memory Statistics: (page size of 16384 bytes)"
+    page_size_match = VM_STAT_PAGE_SIZE_RE.search(vm_result.stdout)
+    page_size = int(page_size_match.group(1)) if page_size_match else resource.getpagesize()
 
+    # Only convert the counters read below, and stop once all of them are found
     stats = {}
-    for line in vm_result.stdout.split("\n"):
-        if ":" in line:
-            key, val = line.split(":", 1)
-            try:
-                stats[key.strip()] = int(val.strip().rstrip("."))
-            except ValueError:
-                pass
+    remaining = set(VM_STAT_KEYS)
+    for line in vm_result.stdout.splitlines():
+        key, sep, val = line.partition(":")
+        key = key.strip()
+        if not sep or key not in remaining:
+            continue
+        try:
+            stats[key] = int(val.strip().rstrip("."))
+        except ValueError:
+            continue
+        remaining.discard(key)
+        if not remaining:
+            break
 
     # Calculate memory usage
     pages_free = stats.get("Pages free", 0)
@@ -343,56 +427,24 @@ def get_system_stats() -> dict:
     # Swap usage via sysctl
     swap_total_gb = swap_used_gb = swap_percent = 0.0
     try:
-        swap_result = subprocess.run(
-            ["sysctl", "-n", "vm.swapusage"],
-            capture_output=True,
-            text=True,
-        )
+        swap_result = swap_future.result()
         # Output: "total = 2048.00M  used = 1024.00M  free = 1024.00M  (encrypted)"
-        for part in swap_result.stdout.split():
-            if part.endswith("M"):
-                val = float(part[:-1])
-            elif part.endswith("G"):
-                val = float(part[:-1]) * 1024
-            else:
-                continue
-            # Assign based on preceding keyword
-            if "total" in swap_result.stdout.split()[swap_result.stdout.split().index(part) - 2]:
-                swap_total_gb = val / 1024
-            elif "used" in swap_result.stdout.split()[swap_result.stdout.split().index(part) - 2]:
-                swap_used_gb = val / 1024
+        # Split once, then read the value that follows each keyword
+        tokens = swap_result.stdout.replace("=", " ").split()
+        for i, token in enumerate(tokens[:-1]):
+            if token == "total":
+                swap_total_gb = swap_size_gb(tokens[i + 1])
+            elif token == "used":
+                swap_used_gb = swap_size_gb(tokens[i + 1])
         if swap_total_gb > 0:
             swap_percent = (swap_used_gb / swap_total_gb) * 100
-    except (subprocess.SubprocessError, ValueError, IndexError):
-        # Fallback: parse more carefully
-        try:
-            swap_result = subprocess.run(
-                ["sysctl", "-n", "vm.swapusage"],
-                capture_output=True,
-                text=True,
-            )
-            parts = swap_result.stdout.replace("=", " ").split()
-            for i, p in enumerate(parts):
-                if p == "total" and i + 1 < len(parts):
-                    val = parts[i + 1]
-                    swap_total_gb = float(val.rstrip("MG")) / (1 if val.endswith("G") else 1024)
-                elif p == "used" and i + 1 < len(parts):
-                    val = parts[i + 1]
-                    swap_used_gb = float(val.rstrip("MG")) / (1 if val.endswith("G") else 1024)
-            if swap_total_gb > 0:
-                swap_percent = (swap_used_gb / swap_total_gb) * 100
-        except Exception:
-            pass
+    except (subprocess.SubprocessError, ValueError):
+        pass
 
     # Memory pressure
     mem_pressure = "unknown"
     try:
-        pressure_result = subprocess.run(
-            ["memory_pressure"],
-            capture_output=True,
-            text=True,
-            timeout=5,
-        )
+        pressure_result = pressure_future.result()
         # Look for "System-wide memory free percentage: XX%"
         for line in pressure_result.stdout.split("\n"):
             if "free percentage" in line.lower():
@@ -404,26 +456,6 @@ def get_system_stats() -> dict:
     except (subprocess.SubprocessError, subprocess.TimeoutExpired):
         pass
 
-    # CPU usage via top (single sample)
-    top_result = subprocess.run(
-        ["top", "-l", "1", "-n", "0", "-s", "0"],
-        capture_output=True,
-        text=True,
-    )
-    cpu_user = cpu_sys = cpu_idle = 0.0
-    for line in top_result.stdout.split("\n"):
-        if line.startswith("CPU usage:"):
-            # CPU usage: 5.26% user, 10.52% sys, 84.21% idle
-            parts = line.split(",")
-            for part in parts:
-                if "user" in part:
-                    cpu_user = float(part.split("%")[0].split()[-1])
-                elif "sys" in part:
-                    cpu_sys = float(part.split("%")[0].split()[-1])
-                elif "idle" in part:
-                    cpu_idle = float(part.split("%")[0].split()[-1])
-            break
-
     return {
         "cpu_user": cpu_user,
         "cpu_sys": cpu_sys,
@@ -461,9 +493,9 @@ def main():
             pass
 
     # Get system stats
-    print("=" * 70)
+    print(SEPARATOR)
     print("SYSTEM OVERVIEW")
-    print("=" * 70)
+    print(SEPARATOR)
 
     stats = get_system_stats()
     print(f"CPU Usage: {stats['cpu_used']:.1f}% (user: {stats['cpu_user']:.1f}%, sys: {stats['cpu_sys']:.1f}%, idle: {stats['cpu_idle']:.1f}%)")
@@ -481,24 +513,22 @@ def main():
         if stats['pageouts'] > 10000 or stats['swapouts'] > 1000:
             print("           ↑ High pageouts/swapouts indicate memory pressure!")
 
-    # Get processes with memory details for swap analysis
-    all_procs_with_mem = get_processes_with_memory()
+    # One ps snapshot feeds swap analysis, orphan detection, top list, and ancestry
+    processes = snapshot_processes()
 
     # Show swap-heavy processes if swap is being used
     if stats['swap_used_gb'] > 0.1:  # More than 100MB swap used
         print()
-        print("=" * 70)
+        print(SEPARATOR)
         print("ESTIMATED SWAP USAGE BY PROCESS (VSIZE - RSS approximation)")
-        print("=" * 70)
+        print(SEPARATOR)
         print("Note: This is an estimate. VSIZE includes shared libs & mapped files.")
         print()
 
-        swap_procs = get_swap_heavy_processes(all_procs_with_mem, limit=10)
+        swap_procs = get_swap_heavy_processes(processes, limit=10)
         if swap_procs:
             for i, (proc, est_swap) in enumerate(swap_procs, 1):
-                cmd_display = proc.command
-                if len(cmd_display) > 50:
-                    cmd_display = cmd_display[:47] + "..."
+                cmd_display = truncate(proc.command, 50)
                 est_swap_gb = est_swap / 1024
                 print(f"#{i} [{proc.pid}] ~{est_swap_gb:.1f} GB swapped (VSIZE: {proc.vsize_mb/1024:.1f}GB, RSS: {proc.rss_mb/1024:.1f}GB)")
                 print(f"   {cmd_display}")
@@ -506,7 +536,7 @@ def main():
             print("No processes with significant estimated swap usage found.")
 
     # Detect orphan processes
-    orphan_trees = get_orphan_processes()
+    orphan_trees = get_orphan_processes(processes)
     if orphan_trees:
         # Count total processes including descendants
         all_pids: list[int] = []
@@ -519,21 +549,19 @@ def main():
         total_count = len(all_pids)
 
         print()
-        print("=" * 70)
+        print(SEPARATOR)
         if total_count > root_count:
             print(f"ORPHAN PROCESSES ({root_count} roots, {total_count} total with children)")
         else:
             print(f"ORPHAN PROCESSES ({total_count} found)")
-        print("=" * 70)
+        print(SEPARATOR)
         print("These are likely abandoned dev processes (PPID=1, script/node/bun).")
         print("Process trees show root orphans and their descendants.")
         print()
 
         def print_tree(tree: OrphanTree, depth: int = 0, is_last: bool = True, prefix: str = ""):
             """Recursively print process tree."""
-            cmd_display = tree.root.command
-            if len(cmd_display) > 45:
-                cmd_display = cmd_display[:42] + "..."
+            cmd_display = truncate(tree.root.command, 45)
 
             if depth == 0:
                 # Root level - no tree prefix
@@ -560,50 +588,32 @@ def main():
         print(f"  Total orphan memory: {total_mem:.1f} MB")
         print(f"  To kill all ({total_count} processes): kill {' '.join(str(pid) for pid in all_pids)}")
 
-    # Get all processes for ancestry lookup
-    all_result = subprocess.run(
-        ["ps", "-eo", "pid,ppid,pcpu,pmem,command"],
-        capture_output=True,
-        text=True,
-    )
-    all_procs: dict[int, ProcessInfo] = {}
-    for line in all_result.stdout.strip().split("\n")[1:]:
-        parts = line.split(None, 4)
-        if len(parts) >= 5:
-            try:
-                pid = int(parts[0])
-                all_procs[pid] = ProcessInfo(
-                    pid=pid,
-                    ppid=int(parts[1]),
-                    cpu=float(parts[2]),
-                    mem=float(parts[3]),
-                    command=parts[4],
-                )
-            except (ValueError, IndexError):
-                continue
+    # Index the snapshot for ancestry lookup; top processes often share parents
+    all_procs = {proc.pid: proc for proc in processes}
+    ancestry_cache: dict[int, list[str]] = {}
 
     # Get top processes
-    top_procs = get_top_processes(sort_by=sort_by, limit=limit)
+    top_procs = get_top_processes(processes, sort_by=sort_by, limit=limit)
 
     print()
-    print("=" * 70)
+    print(SEPARATOR)
     print(f"TOP {limit} PROCESSES (sorted by {sort_by.upper()})")
-    print("=" * 70)
+    print(SEPARATOR)
 
     for i, proc in enumerate(top_procs, 1):
-        cmd_display = proc.command
-        if len(cmd_display) > 60:
-            cmd_display = cmd_display[:57] + "..."
+        cmd_display = truncate(proc.command, 60)
 
         print(f"\n#{i} [{proc.pid}] CPU: {proc.cpu:.1f}%  MEM: {proc.mem:.1f}%")
         print(f"   Command: {cmd_display}")
         print("   Process Tree (child → parent):")
 
-        ancestry = get_process_ancestry(proc.pid, all_procs)
+        ancestry = get_process_ancestry(proc.pid, all_procs, ancestry_cache)
         for j, ancestor in enumerate(ancestry):
             indent = "   " + "  " * j + ("└─ " if j > 0 else "── ")
             print(f"{indent}{ancestor}")
 
 
 if __name__ == "__main__":
+    # The report can run to hundreds of lines; don't flush a terminal on every one
+    sys.stdout.reconfigure(line_buffering=False)
     main()
@@ -6,10 +6,16 @@ Scans for cleanable items and provides interactive cleanup.
 
 import os
 import shutil
+import stat
 import subprocess
 import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dataclasses import dataclass, field
+from functools import lru_cache
+from itertools import groupby
+from operator import attrgetter
 from pathlib import Path
+from typing import Callable, Optional, Union
 
 
 @dataclass
@@ -48,6 +54,15 @@ class LargeItem:
         return format_size(self.size_bytes)
 
 
+@dataclass(frozen=True)
+class CleanableTarget:
+    name: str
+    path: Path  # already expanded
+    risk: str
+    description: str
+    clean_func: str = "rm_rf"
+
+
 # Cleanable targets configuration
 CLEANABLE_TARGETS: list[dict] = [
     # SAFE - caches that auto-regenerate
@@ -164,35 +179,71 @@ CLEANABLE_TARGETS: list[dict] = [
     },
 ]
 
+# Display order of risk groups; items are kept sorted by it so list index == screen number
+RISK_ORDER = {"safe": 0, "moderate": 1, "caution": 2}
+RISK_LABELS = {
+    "safe": "[SAFE] Auto-regenerates, safe to delete:",
+    "moderate": "[MODERATE] Requires rebuild/redownload:",
+    "caution": "[CAUTION] Review before deleting:",
+}
+
+# Directories at least this large are removed with rm -rf instead of shutil.rmtree
+RM_RF_THRESHOLD = 1024 * 1024 * 1024
+
+# Resolved once at import so rescans don't redo expanduser() and dict lookups
+TARGETS: tuple[CleanableTarget, ...] = tuple(
+    CleanableTarget(
+        name=target["name"],
+        path=Path(target["path"]).expanduser(),
+        risk=target["risk"],
+        description=target["description"],
+        clean_func=target.get("clean_func", "rm_rf"),
+    )
+    for target in CLEANABLE_TARGETS
+)
+
+
+SIZE_UNITS = ("B", "KB", "MB", "GB", "TB", "PB")
+
 
+@lru_cache(maxsize=4096)
 def format_size(size_bytes: int) -> str:
     """Format bytes to human readable string."""
     if size_bytes < 0:
         return "0 B"
-    for unit in ["B", "KB", "MB", "GB", "TB"]:
-        if size_bytes < 1024:
-            return f"{size_bytes:.1f} {unit}"
-        size_bytes /= 1024
-    return f"{size_bytes:.1f} PB"
+    # Each unit is 2**10 of the previous one, so the bit length picks it directly
+    unit_idx = min(max(size_bytes.bit_length() - 1, 0) // 10, len(SIZE_UNITS) - 1)
+    return f"{size_bytes / (1 << (unit_idx * 10)):.1f} {SIZE_UNITS[unit_idx]}"
 
 
-def get_dir_size(path: Path) -> int:
+def get_dir_size(path: Union[str, Path]) -> int:
     """Get total size of directory in bytes."""
-    if not path.exists():
+    # One stat answers both "does it exist" and "is it a plain file"
+    try:
+        st = os.stat(path)
+    except OSError:
         return 0
-    if path.is_file():
-        return path.stat().st_size
+    if stat.S_ISREG(st.st_mode):
+        return st.st_size
 
+    # Walk with os.scandir: DirEntry answers file/dir/symlink from the cached d_type,
+    # so each regular file costs a single lstat. Symlinks are neither counted nor
+    # followed (the root itself may be a symlink, like rglob allowed).
     total = 0
-    try:
-        for entry in path.rglob("*"):
-            try:
-                if entry.is_file() and not entry.is_symlink():
-                    total += entry.stat().st_size
-            except (PermissionError, OSError):
-                continue
-    except (PermissionError, OSError):
-        pass
+    stack = [os.fspath(path)]
+    while stack:
+        try:
+            with os.scandir(stack.pop()) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_file(follow_symlinks=False):
+                            total += entry.stat(follow_symlinks=False).st_size
+                        elif entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+                    except OSError:
+                        continue
+        except OSError:
+            continue
     return total
 
 
@@ -238,32 +289,46 @@ def get_disk_overview() -> list[MountPoint]:
     return mounts
 
 
-def scan_cleanable_items() -> list[CleanableItem]:
-    """Scan for cleanable items and calculate their sizes."""
-    items = []
+def print_scan_progress(done: int, total: int, name: str):
+    """Overwrite the current terminal line with scan progress; clear it when done."""
+    line = "" if done == total else f"  [{done}/{total}] {name}"
+    print(f"\r{line}\033[K", end="", flush=True)
 
-    for target in CLEANABLE_TARGETS:
-        path = Path(target["path"]).expanduser()
-        if not path.exists():
-            continue
 
-        size = get_dir_size(path)
-        if size < 1024 * 1024:  # Skip if < 1MB
+def scan_cleanable_items(
+    progress: Optional[Callable[[int, int, str], None]] = None,
+) -> list[CleanableItem]:
+    """Scan for cleanable items and calculate their sizes.
+
+    progress, if given, is called as progress(done, total, name) as each target finishes.
+    """
+    # Targets are independent trees; size them concurrently (scandir/stat release the GIL)
+    with ThreadPoolExecutor() as pool:
+        futures = [pool.submit(get_dir_size, target.path) for target in TARGETS]
+        if progress:
+            names = {future: target.name for future, target in zip(futures, TARGETS)}
+            for done, future in enumerate(as_completed(futures), 1):
+                progress(done, len(futures), names[future])
+        sizes = [future.result() for future in futures]
+
+    items = []
+    for target, size in zip(TARGETS, sizes):
+        if size < 1024 * 1024:  # Skip if < 1MB (missing targets size to 0)
             continue
 
         items.append(
             CleanableItem(
-                name=target["name"],
-                path=path,
+                name=target.name,
+                path=target.path,
                 size_bytes=size,
-                risk=target["risk"],
-                description=target["description"],
-                clean_func=target.get("clean_func", "rm_rf"),
+                risk=target.risk,
+                description=target.description,
+                clean_func=target.clean_func,
             )
         )
 
-    # Sort by size descending
-    items.sort(key=lambda x: x.size_bytes, reverse=True)
+    # Group by risk, largest first within each group
+    items.sort(key=lambda x: (RISK_ORDER[x.risk], -x.size_bytes))
     return items
 
 
@@ -274,62 +339,73 @@ def scan_large_items(
     min_size = min_size_mb * 1024 * 1024
     large_items = []
 
-    def scan_dir(path: Path, depth: int):
-        if depth > max_depth:
-            return
+    def scan_dir(path: str, depth: int) -> int:
+        """Record large entries under path; return path's total size.
 
+        Sizes are summed on the way back up, so each file is stat'ed once instead of
+        once per ancestor directory that used to call get_dir_size. Entries stay as
+        str/DirEntry (cached d_type, no Path objects) until they are reported.
+        """
         try:
-            entries = list(path.iterdir())
-        except (PermissionError, OSError):
-            return
+            with os.scandir(path) as it:
+                entries = list(it)
+        except OSError:
+            return 0
 
+        total = 0
         for entry in entries:
             try:
-                if entry.is_symlink():
-                    continue
-
-                if entry.is_file():
-                    size = entry.stat().st_size
+                # Symlinks are neither counted nor followed
+                if entry.is_file(follow_symlinks=False):
+                    size = entry.stat(follow_symlinks=False).st_size
+                    total += size
                     if size >= min_size:
                         large_items.append(
-                            LargeItem(path=entry, size_bytes=size, item_type="file")
+                            LargeItem(path=Path(entry.path), size_bytes=size, item_type="file")
                         )
-                elif entry.is_dir():
-                    # Skip system directories
+                elif entry.is_dir(follow_symlinks=False):
+                    # Skip system directories (still counted in the parent's size)
                     if entry.name.startswith(".") and entry.name in [
                         ".Trash",
                         ".Spotlight-V100",
                         ".fseventsd",
                     ]:
+                        total += get_dir_size(entry.path)
                         continue
 
-                    dir_size = get_dir_size(entry)
+                    # Recurse while within max_depth; below that only the size matters
+                    if depth < max_depth:
+                        dir_size = scan_dir(entry.path, depth + 1)
+                    else:
+                        dir_size = get_dir_size(entry.path)
+                    total += dir_size
                     if dir_size >= min_size:
                         large_items.append(
                             LargeItem(
-                                path=entry, size_bytes=dir_size, item_type="directory"
+                                path=Path(entry.path), size_bytes=dir_size, item_type="directory"
                             )
                         )
-                    # Recurse into directory
-                    scan_dir(entry, depth + 1)
-            except (PermissionError, OSError):
+            except OSError:
                 continue
+        return total
 
-    scan_dir(root, 0)
+    scan_dir(os.fspath(root), 0)
 
     # Sort by size descending and dedupe (parent dirs contain children)
     large_items.sort(key=lambda x: x.size_bytes, reverse=True)
     return large_items[:20]  # Top 20
 
 
-def clean_item(item: CleanableItem, dry_run: bool = False) -> bool:
-    """Clean a single item. Returns True if successful."""
+def clean_item(item: CleanableItem, dry_run: bool = False) -> tuple[bool, str]:
+    """Clean a single item. Returns (success, message for the user or "").
+
+    Nothing is printed here: cleanups run on worker threads, so the caller prints.
+    """
     if not item.path.exists():
-        return True
+        return True, ""
 
     if dry_run:
-        print(f"  [DRY-RUN] Would delete: {item.path}")
-        return True
+        return True, f"  [DRY-RUN] Would delete: {item.path}"
 
     try:
         if item.clean_func == "empty_trash":
@@ -341,18 +417,31 @@ def clean_item(item: CleanableItem, dry_run: bool = False) -> bool:
                     'tell application "Finder" to empty trash',
                 ],
                 capture_output=True,
+                text=True,
                 check=True,
             )
         else:
             # rm -rf
             if item.path.is_dir():
-                shutil.rmtree(item.path)
+                # rm -rf would quietly remove just a symlink to a directory, where
+                # shutil.rmtree refuses it; keep symlinks on the rmtree path
+                if item.size_bytes >= RM_RF_THRESHOLD and not item.path.is_symlink():
+                    # Native rm unlinks huge trees without a Python round-trip per file
+                    subprocess.run(
+                        ["rm", "-rf", str(item.path)],
+                        capture_output=True,
+                        text=True,
+                        check=True,
+                    )
+                else:
+                    shutil.rmtree(item.path)
             else:
                 item.path.unlink()
-        return True
-    except (PermissionError, OSError, subprocess.CalledProcessError) as e:
-        print(f"  Error cleaning {item.name}: {e}")
-        return False
+        return True, ""
+    except subprocess.CalledProcessError as e:
+        return False, f"  Error cleaning {item.name}: {e.stderr.strip() or e}"
+    except (PermissionError, OSError) as e:
+        return False, f"  Error cleaning {item.name}: {e}"
 
 
 def print_overview(mounts: list[MountPoint]):
@@ -392,21 +481,10 @@ def print_cleanable_items(items: list[CleanableItem]):
     print(f"CLEANABLE ITEMS ({len(items)} items, {format_size(total_size)} total)")
     print("=" * 70)
 
-    # Group by risk
-    risk_order = ["safe", "moderate", "caution"]
-    risk_labels = {
-        "safe": "[SAFE] Auto-regenerates, safe to delete:",
-        "moderate": "[MODERATE] Requires rebuild/redownload:",
-        "caution": "[CAUTION] Review before deleting:",
-    }
-
+    # Items arrive grouped by risk (see scan_cleanable_items), so one pass prints them
     idx = 1
-    for risk in risk_order:
-        risk_items = [i for i in items if i.risk == risk]
-        if not risk_items:
-            continue
-
-        print(f"\n{risk_labels[risk]}")
+    for risk, risk_items in groupby(items, key=attrgetter("risk")):
+        print(f"\n{RISK_LABELS[risk]}")
         for item in risk_items:
             checkbox = "[x]" if item.selected else "[ ]"
             print(f"  {idx:2}. {checkbox} {item.name:<24} {item.size_human:>10}")
@@ -423,11 +501,13 @@ def interactive_cleanup(items: list[CleanableItem]):
         if item.risk == "safe":
             item.selected = True
 
+    # Usage only changes when we delete something; refresh it then, not on every keystroke
+    mounts = get_disk_overview()
+
     while True:
         # Clear screen and reprint
         print("\033[2J\033[H", end="")  # Clear screen
 
-        mounts = get_disk_overview()
         print_overview(mounts)
         print_cleanable_items(items)
 
@@ -439,7 +519,7 @@ def interactive_cleanup(items: list[CleanableItem]):
         print(f"Selected: {len(selected)} items, {format_size(selected_size)}")
         print()
         print("Commands: [1-9] toggle | [a]ll-safe | [m]oderate | [c]aution | [n]one")
-        print("          [Enter] execute cleanup | [d]ry-run | [q]uit")
+        print("          [Enter] execute cleanup | [d]ry-run | [r]escan | [q]uit")
         print()
 
         try:
@@ -511,25 +591,42 @@ def interactive_cleanup(items: list[CleanableItem]):
                 input("Press Enter to continue...")
                 continue
 
-            print("\nCleaning...")
+            print(f"\nCleaning {len(selected)} items...")
             freed = 0
-            for item in selected:
-                print(f"  Deleting {item.name}...", end=" ", flush=True)
-                if clean_item(item):
-                    print(f"✓ freed {item.size_human}")
-                    freed += item.size_bytes
-                    item.selected = False
-                else:
-                    print("✗ failed")
+            cleaned = set()
+            # Targets are independent trees; a few workers overlap their unlink syscalls
+            # without thrashing APFS metadata locks. Results are printed here, in
+            # submission order, so lines from parallel deletions never interleave.
+            with ThreadPoolExecutor(max_workers=4) as pool:
+                futures = [pool.submit(clean_item, item) for item in selected]
+                for item, future in zip(selected, futures):
+                    ok, message = future.result()
+                    if message:
+                        print(message)
+                    if ok:
+                        print(f"  ✓ {item.name}: freed {item.size_human}")
+                        freed += item.size_bytes
+                        cleaned.add(id(item))
+                    else:
+                        print(f"  ✗ {item.name}: failed")
 
             print(f"\nTotal freed: {format_size(freed)}")
             input("Press Enter to continue...")
 
-            # Rescan items
-            items[:] = scan_cleanable_items()
+            # Only the deleted items changed; the other sizes are still accurate
+            items[:] = [i for i in items if id(i) not in cleaned]
+            if not items:
+                print("\nAll clean! No more items to clean.")
+                return
+            mounts = get_disk_overview()
+
+        elif choice == "r":
+            print("\nRescanning...")
+            items[:] = scan_cleanable_items(print_scan_progress if sys.stdout.isatty() else None)
             if not items:
                 print("\nAll clean! No more items to clean.")
                 return
+            mounts = get_disk_overview()
 
         elif choice.isdigit():
             idx = int(choice) - 1
@@ -589,7 +686,7 @@ def main():
     # Scan cleanable items
     if show_clean:
         print("\nScanning for cleanable items...")
-        items = scan_cleanable_items()
+        items = scan_cleanable_items(print_scan_progress if sys.stdout.isatty() else None)
 
         if interactive and items:
             interactive_cleanup(items)